@@ -0,0 +1,46 @@
+-- sql/migrations/001_materialized_views.sql
+-- Materialized views backing the dashboard queries
+-- Run after schema.sql:  psql -d weather_db -f sql/migrations/001_materialized_views.sql
+
+-- Latest weather record per city
+-- (materialized version of the latest_weather view)
+DROP MATERIALIZED VIEW IF EXISTS mv_latest_weather;
+CREATE MATERIALIZED VIEW mv_latest_weather AS
+SELECT DISTINCT ON (city)
+    *
+FROM weather_data
+ORDER BY city, timestamp DESC;
+
+-- A unique index is required for REFRESH MATERIALIZED VIEW CONCURRENTLY
+CREATE UNIQUE INDEX idx_mv_latest_weather_city ON mv_latest_weather(city);
+
+-- Daily pre-aggregates per city
+-- Sums and non-null counts are stored (rather than averages) so that
+-- averages over any range of days can be recombined exactly
+DROP MATERIALIZED VIEW IF EXISTS mv_weather_daily;
+CREATE MATERIALIZED VIEW mv_weather_daily AS
+SELECT
+    city,
+    timestamp::DATE AS day,
+    COUNT(*) AS record_count,
+    SUM(temperature) AS temp_sum,
+    COUNT(temperature) AS temp_count,
+    MIN(temperature) AS min_temp,
+    MAX(temperature) AS max_temp,
+    SUM(humidity) AS humidity_sum,
+    COUNT(humidity) AS humidity_count,
+    SUM(pressure) AS pressure_sum,
+    COUNT(pressure) AS pressure_count,
+    SUM(wind_speed) AS wind_speed_sum,
+    COUNT(wind_speed) AS wind_speed_count
+FROM weather_data
+GROUP BY city, timestamp::DATE;
+
+CREATE UNIQUE INDEX idx_mv_weather_daily_city_day ON mv_weather_daily(city, day);
+
+COMMENT ON MATERIALIZED VIEW mv_latest_weather IS 'Latest weather record per city, refreshed after each ingest';
+COMMENT ON MATERIALIZED VIEW mv_weather_daily IS 'Per-city daily weather aggregates, refreshed after each ingest';
+
+-- Refresh both views (done by the pipeline after every insert):
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY mv_latest_weather;
+-- REFRESH MATERIALIZED VIEW CONCURRENTLY mv_weather_daily;
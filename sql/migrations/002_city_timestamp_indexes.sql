@@ -0,0 +1,12 @@
+-- sql/migrations/002_city_timestamp_indexes.sql
+-- Make sure the indexes behind the historical/statistics queries exist
+-- on databases that were not created from the current schema.sql
+-- (no-op where they already exist)
+-- CONCURRENTLY builds without blocking inserts, so run it outside a transaction:
+--   psql -d weather_db -f sql/migrations/002_city_timestamp_indexes.sql
+
+-- Per-city time range scans: WHERE city = ? AND timestamp >= ?
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_city_timestamp ON weather_data(city, timestamp DESC);
+
+-- Time range scans across all cities
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_timestamp ON weather_data(timestamp DESC);
@@ -0,0 +1,55 @@
+# src/_fast.py
+"""
+Numba-compiled kernels for the transformation step.
+Used for large batches only; small batches go through plain pandas so
+typical runs never pay the one-off cost of compiling/loading the kernel.
+"""
+
+from numba import njit, prange
+
+
+@njit(parallel=True, cache=True)
+def validate_kernel(temp, humidity, pressure, wind, ranges, usual_pressure, is_valid):
+    """
+    Range-checks and clips a batch of readings in a single pass.
+    Missing readings are NaN and count as valid, as in validate_df.
+
+    Parameters:
+        temp, humidity, pressure, wind (numpy.ndarray): float readings;
+            humidity and wind are clipped in place
+        ranges (numpy.ndarray): (4, 2) low/high bounds, in the same order
+        usual_pressure (tuple): low/high pressure that is not worth a warning
+        is_valid (numpy.ndarray): bool output, one flag per row
+
+    Returns:
+        tuple: Counts of invalid rows, humidity out of 0-100, pressure
+            outside usual_pressure and negative wind speeds
+    """
+
+    invalid = 0
+    humidity_out = 0
+    pressure_out = 0
+    wind_negative = 0
+
+    for i in prange(temp.shape[0]):
+        t, h, p, w = temp[i], humidity[i], pressure[i], wind[i]
+
+        # NaN fails every comparison, so "not outside" keeps it valid
+        ok = not (t < ranges[0, 0] or t > ranges[0, 1])
+        ok &= not (h < ranges[1, 0] or h > ranges[1, 1])
+        ok &= not (p < ranges[2, 0] or p > ranges[2, 1])
+        ok &= not (w < ranges[3, 0] or w > ranges[3, 1])
+        is_valid[i] = ok
+        if not ok:
+            invalid += 1
+
+        if h < 0 or h > 100:
+            humidity_out += 1
+            humidity[i] = min(100.0, max(0.0, h))
+        if p < usual_pressure[0] or p > usual_pressure[1]:
+            pressure_out += 1
+        if w < 0:
+            wind_negative += 1
+            wind[i] = 0.0
+
+    return invalid, humidity_out, pressure_out, wind_negative
@@ -1,41 +1,86 @@
 """ configuration file for loadinf environment variables and settings.
 central place for all the configuration in the project. """
 
+from __future__ import annotations
+
 import os
-from dotenv import load_dontenv
+from dataclasses import dataclass, field
+from functools import lru_cache
+from dotenv import load_dotenv
 from pathlib import Path
+from typing import Optional
 
 # Get the project root directory
 # __file__ is the path to this config.py file
 # .parent.parent goes up two levels: src/ -> weather-data-pipeline/
 BASE_DIR = Path(__file__).resolve().parent.parent
 
-# load environment variables from .env file
-# This reads the .env file and makes variables available via os.gotenv()
-
-load_dontenv(BASE_DIR / '.env')
-
-# API configuration
-OPENWEATHER_API_KEY = os.getenv('OPENWEATHER_API_KEY')
-OPENWEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
-DEFAULT_CITY = os.getenv('DEFAULT_CITY', 'Toronto')  # default city toronto
-
-# Database configuration 
-DB_CONFIG = {
-    'host': os.getenv('DB_HOST', 'localhost'),
-    'database': os.getenv('DB_NAME', 'weather_db'),
-    'user': os.getenv('DB_USER', 'postgres'),
-    'password': os.getenv('DB_PASSWORD', 'postgres')
-}
-
 # logging configuration
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(exist_ok=True) # create logs directory if it doesnt exists
 LOG_FILE = LOG_DIR / 'pipeline.log'
 
-# data collection settings
-FETCH_INTERVAL_MINUTES = 5   # how often to fetch the weather data
-CITIES_TO_TRACK = ['Toronto', 'Montreal', 'Vancouver'] # cities to monitor
+# local cache of the latest fetched batch (Parquet)
+CACHE_DIR = BASE_DIR / 'cache'
+CACHE_DIR.mkdir(exist_ok=True)
+CACHE_FILE = CACHE_DIR / 'latest_weather.parquet'
+
+
+@dataclass(frozen=True)
+class Config:
+    """
+    Immutable snapshot of the pipeline settings.
+    Secrets are left out of the repr so they don't end up in logs.
+    """
+    # API configuration
+    openweather_api_key: Optional[str] = field(repr=False)
+    openweather_base_url: str
+    default_city: str
+
+    # Database configuration
+    db: dict = field(repr=False)
+
+    # data collection settings
+    fetch_interval_minutes: int
+    cities: tuple[str, ...]
+
+
+@lru_cache(maxsize=1)
+def get_config():
+    """
+    Load the .env file and build the settings, once per process.
+
+    Returns:
+        Config: The pipeline configuration
+    """
+    # load environment variables from .env file
+    # This reads the .env file and makes variables available via os.getenv()
+    load_dotenv(BASE_DIR / '.env')
+
+    return Config(
+        openweather_api_key=os.getenv('OPENWEATHER_API_KEY'),
+        openweather_base_url="https://api.openweathermap.org/data/2.5/weather",
+        default_city=os.getenv('DEFAULT_CITY', 'Toronto'),  # default city toronto
+        db={
+            'host': os.getenv('DB_HOST', 'localhost'),
+            'database': os.getenv('DB_NAME', 'weather_db'),
+            'user': os.getenv('DB_USER', 'postgres'),
+            'password': os.getenv('DB_PASSWORD', 'postgres')
+        },
+        fetch_interval_minutes=5,   # how often to fetch the weather data
+        cities=('Toronto', 'Montreal', 'Vancouver')  # cities to monitor
+    )
+
+
+cfg = get_config()
+
+# Module-level names used throughout the pipeline
+OPENWEATHER_API_KEY = cfg.openweather_api_key
+OPENWEATHER_BASE_URL = cfg.openweather_base_url
+DEFAULT_CITY = cfg.default_city
+DB_CONFIG = cfg.db
+FETCH_INTERVAL_MINUTES = cfg.fetch_interval_minutes
+CITIES_TO_TRACK = cfg.cities
 
 # Validate that required environment variables are set
 def validate_config():
@@ -43,18 +88,17 @@ def validate_config():
     Check that all required config is present.
     Raises an error if something is missing
     """
-    if not OPENWEATHER_API_KEY:
+    if not cfg.openweather_api_key:
         raise ValueError(
             "❌ OPENWEATHER_API_KEY not found in .env file!\n"
             "Please create a .env file with your API key"
         )
     print("✅ configuration loaded successfully!")
-    print(f"📍 Default city: {DEFAULT_CITY}")
-    print(f"🔑 API Key: {OPENWEATHER_API_KEY[:10]}... (hidden)")
+    print(f"📍 Default city: {cfg.default_city}")
+    print(f"🔑 API Key: {cfg.openweather_api_key[:10]}... (hidden)")
 
 
 # Run validation when module is imported
 if __name__ == "__main__":
     validate_config()
 
-    
\ No newline at end of file
@@ -4,15 +4,65 @@ Data ingestion module for fetching weather data from OpenWeatherMap API.
 This is the 'Extract' part of the ETL pipeline.
 """
 
+import asyncio
+import threading
+import aiohttp
 import requests
-import json
+import orjson
+from cachetools import TTLCache
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from config import (
     OPENWEATHER_API_KEY, 
     OPENWEATHER_BASE_URL, 
     CITIES_TO_TRACK
 )
 
+# Rate-limit (429) and server errors are retried with exponential
+# backoff, by both the requests session and the async fetcher
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+RETRY_BACKOFF_FACTOR = 0.3
+MAX_RETRY_DELAY = 10  # seconds; caps a server's Retry-After
+
+# Shared HTTP session so every request reuses pooled keep-alive
+# connections instead of opening a new TCP/TLS connection per city.
+SESSION = requests.Session()
+_adapter = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=list(RETRY_STATUSES),
+        raise_on_status=False  # hand back the last response once retries run out
+    )
+)
+SESSION.mount('https://', _adapter)
+SESSION.mount('http://', _adapter)
+
+# Recent successful API responses per city. Entries expire before the
+# next scheduled fetch (every FETCH_INTERVAL_MINUTES), so repeated requests
+# for a city within one cycle are answered from memory.
+CACHE_TTL_SECONDS = 240
+_CACHE = TTLCache(maxsize=256, ttl=CACHE_TTL_SECONDS)
+_CACHE_LOCK = threading.Lock()  # TTLCache is not thread-safe
+
+def _get_cached(city):
+    """Return the cached response for a city, or None."""
+    with _CACHE_LOCK:
+        return _CACHE.get(city)
+
+def _set_cached(city, data):
+    """Cache a successful response for a city."""
+    with _CACHE_LOCK:
+        _CACHE[city] = data
+
+# Limits on in-flight requests when fetching many cities at once
+MAX_CONCURRENT_REQUESTS = 100
+MAX_REQUESTS_PER_HOST = 20
+
 def fetch_weather_data(city):
     """
     Fetches current weather data for a specific city.
@@ -23,6 +73,10 @@ def fetch_weather_data(city):
     Returns:
         dict: Weather data as a dictionary, or None if request failed
     """
+    cached = _get_cached(city)
+    if cached is not None:
+        return cached
+    
     params = {
         'q': city,
         'appid': OPENWEATHER_API_KEY,
@@ -30,10 +84,12 @@ def fetch_weather_data(city):
     }
     
     try:
-        response = requests.get(OPENWEATHER_BASE_URL, params=params, timeout=10)
+        response = SESSION.get(OPENWEATHER_BASE_URL, params=params, timeout=10)
         
         if response.status_code == 200:
-            return response.json()
+            data = orjson.loads(response.content)
+            _set_cached(city, data)
+            return data
         else:
             print(f"❌ Error fetching data for {city}: Status {response.status_code}")
             return None
@@ -42,6 +98,96 @@ def fetch_weather_data(city):
         print(f"❌ Exception while fetching data for {city}: {str(e)}")
         return None
 
+async def _fetch(session, city):
+    """
+    Fetches current weather data for one city on an aiohttp session.
+    
+    Parameters:
+        session (aiohttp.ClientSession): Open client session
+        city (str): Name of the city
+    
+    Returns:
+        dict: Weather data as a dictionary, or None if request failed
+    """
+    cached = _get_cached(city)
+    if cached is not None:
+        return cached
+    
+    params = {
+        'q': city,
+        'appid': OPENWEATHER_API_KEY,
+        'units': 'metric'  # Celsius, m/s for wind
+    }
+    
+    # Same retry policy as SESSION: up to MAX_RETRIES more attempts for
+    # RETRY_STATUSES and dropped connections, with exponential backoff
+    for attempt in range(MAX_RETRIES + 1):
+        last_attempt = attempt == MAX_RETRIES
+        try:
+            async with session.get(OPENWEATHER_BASE_URL, params=params) as response:
+                if response.status == 200:
+                    data = orjson.loads(await response.read())
+                    _set_cached(city, data)
+                    return data
+                if response.status not in RETRY_STATUSES or last_attempt:
+                    print(f"❌ Error fetching data for {city}: Status {response.status}")
+                    return None
+                delay = _retry_delay(attempt, response.headers.get('Retry-After'))
+                
+        except aiohttp.ClientConnectionError as e:
+            if last_attempt:
+                print(f"❌ Exception while fetching data for {city}: {str(e)}")
+                return None
+            delay = _retry_delay(attempt)
+        except Exception as e:
+            print(f"❌ Exception while fetching data for {city}: {str(e)}")
+            return None
+        
+        await asyncio.sleep(delay)
+
+def _retry_delay(attempt, retry_after=None):
+    """
+    Seconds to wait before retrying a request.
+    
+    Parameters:
+        attempt (int): Number of the attempt that failed, from 0
+        retry_after (str): The response's Retry-After header, if any
+    
+    Returns:
+        float: Backoff delay, or the server's Retry-After if longer
+               (capped at MAX_RETRY_DELAY)
+    """
+    delay = RETRY_BACKOFF_FACTOR * (2 ** attempt)
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, float(retry_after))
+    return min(delay, MAX_RETRY_DELAY)
+
+async def fetch_all_cities_async(cities=None):
+    """
+    Fetches weather data for many cities concurrently on one event loop.
+    
+    Parameters:
+        cities (list): City names (default: CITIES_TO_TRACK)
+    
+    Returns:
+        list: One entry per city, in order: the weather data dict, or
+              None/an exception if that city failed
+    """
+    if cities is None:
+        cities = CITIES_TO_TRACK
+    
+    connector = aiohttp.TCPConnector(
+        limit=MAX_CONCURRENT_REQUESTS,
+        limit_per_host=MAX_REQUESTS_PER_HOST
+    )
+    timeout = aiohttp.ClientTimeout(total=10)
+    
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        return await asyncio.gather(
+            *[_fetch(session, city) for city in cities],
+            return_exceptions=True
+        )
+
 def fetch_all_cities():
     """
     Fetches weather data for all configured cities.
@@ -53,22 +199,21 @@ def fetch_all_cities():
     
     print(f"📡 Fetching weather data for {len(CITIES_TO_TRACK)} cities...")
     
-    for city in CITIES_TO_TRACK:
-        print(f"  🔍 Fetching {city}...", end=" ")
-        data = fetch_weather_data(city)
-        
-        if data:
+    fetched = asyncio.run(fetch_all_cities_async(CITIES_TO_TRACK))
+    
+    for city, data in zip(CITIES_TO_TRACK, fetched):
+        if isinstance(data, dict):
             results.append(data)
             temp = data['main']['temp']
-            weather = data['weather'][0']['description']
-            print(f"✅ {temp}°C, {weather}")
+            weather = data['weather'][0]['description']
+            print(f"  🔍 {city}: ✅ {temp}°C, {weather}")
         else:
-            print("❌ Failed")
+            print(f"  🔍 {city}: ❌ Failed")
     
     print(f"\n✅ Successfully fetched data for {len(results)}/{len(CITIES_TO_TRACK)} cities")
     return results
 
-def save_to_json(data, filename=None):
+def save_to_json(data, filename=None, pretty=False):
     """
     Saves weather data to a JSON file.
     Useful for testing before setting up database.
@@ -76,13 +221,14 @@ def save_to_json(data, filename=None):
     Parameters:
         data: Weather data (dict or list of dicts)
         filename: Output filename (default: uses timestamp)
+        pretty (bool): Indent the output for reading (default: compact)
     """
     if filename is None:
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"weather_data_{timestamp}.json"
     
-    with open(filename, 'w') as f:
-        json.dump(data, f, indent=2)
+    with open(filename, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else None))
     
     print(f"💾 Data saved to {filename}")
 
@@ -94,9 +240,16 @@ if __name__ == "__main__":
     # Fetch data for all configured cities
     weather_data = fetch_all_cities()
     
-    # Save to JSON file
+    # Save the batch to the local Parquet cache
     if weather_data:
-        save_to_json(weather_data)
-        print("\n✅ Ingestion test completed successfully!")
+        from transformation import transform_multiple_cities
+        from storage import save_cache
+        
+        df = transform_multiple_cities(weather_data)
+        if df is not None:
+            save_cache(df)
+            print("\n✅ Ingestion test completed successfully!")
+        else:
+            print("\n❌ Ingestion test failed: could not transform the batch!")
     else:
         print("\n❌ Ingestion test failed!")
\ No newline at end of file
@@ -5,16 +5,145 @@ This is the 'Load' part of the ETL pipeline.
 Handles all database operations for storing weather data.
 """
 
-import psycopg2
-from psycopg2 import sql, extras
+import io
+import threading
+import time
+import weakref
+from psycopg2 import extras
+from psycopg2.pool import ThreadedConnectionPool
 import pandas as pd
 import logging
-from config import DB_CONFIG
+from config import DB_CONFIG, CACHE_FILE
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns written by insert_weather_data, in table order
+WEATHER_COLUMNS = (
+    'timestamp', 'city', 'country_code', 'latitude', 'longitude',
+    'temperature', 'feels_like', 'temp_min', 'temp_max',
+    'pressure', 'humidity',
+    'weather_main', 'weather_description', 'weather_icon',
+    'wind_speed', 'wind_direction',
+    'cloudiness', 'visibility',
+    'api_timestamp', 'timezone_offset',
+    'data_source', 'is_valid'
+)
+
+# Columns stored as INTEGER; pandas turns them into floats when a value
+# is missing, so they are cast back before writing
+INTEGER_COLUMNS = (
+    'pressure', 'humidity', 'wind_direction', 'cloudiness', 'visibility',
+    'api_timestamp', 'timezone_offset'
+)
+
+# Text columns; Parquet keeps them as strings but reads them back as
+# Python-backed strings, so load_cache restores the Arrow dtype
+TEXT_COLUMNS = (
+    'city', 'country_code', 'weather_main', 'weather_description',
+    'weather_icon', 'data_source'
+)
+
+# Server-side prepared INSERT, created once per pooled connection so the
+# statement is parsed and planned once instead of on every row
+PREPARE_INSERT_QUERY = (
+    f"PREPARE weather_ins AS INSERT INTO weather_data ({', '.join(WEATHER_COLUMNS)}) "
+    f"VALUES ({', '.join(f'${i}' for i in range(1, len(WEATHER_COLUMNS) + 1))})"
+)
+EXECUTE_INSERT_QUERY = f"EXECUTE weather_ins ({', '.join(['%s'] * len(WEATHER_COLUMNS))})"
+
+# Batches at least this large are loaded with COPY instead of INSERT
+COPY_THRESHOLD = 500
+COPY_QUERY = (
+    f"COPY weather_data ({', '.join(WEATHER_COLUMNS)}) "
+    "FROM STDIN WITH (FORMAT CSV, NULL '\\N')"
+)
+
+# Rows fetched per round-trip when streaming historical data
+HISTORY_FETCH_SIZE = 10000
+
+# Keys of the statistics dictionaries, in query column order
+STATISTICS_KEYS = (
+    'record_count', 'avg_temp', 'min_temp', 'max_temp',
+    'avg_humidity', 'avg_pressure', 'avg_wind_speed'
+)
+
+# Connection pool limits (per database configuration)
+POOL_MIN_CONNECTIONS = 1
+POOL_MAX_CONNECTIONS = 8
+
+# Shared connection pools, keyed by database configuration
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+# Pooled connections that already have weather_ins prepared
+_PREPARED_CONNECTIONS = weakref.WeakSet()
+
+# mv_latest_weather is refreshed after every insert, but refreshing
+# mv_weather_daily re-aggregates the whole table, so it runs at most
+# this often (per process and database)
+DAILY_VIEW_REFRESH_MINUTES = 60
+
+# time.monotonic() of the last mv_weather_daily refresh, keyed like _POOLS
+_DAILY_VIEW_REFRESHED_AT = {}
+_DAILY_VIEW_LOCK = threading.Lock()
+
+def _get_pool(config):
+    """
+    Get the shared connection pool for a database configuration,
+    creating it on first use.
+    
+    Parameters:
+        config (dict): Database configuration dictionary
+    
+    Returns:
+        ThreadedConnectionPool: Pool of open connections
+    """
+    
+    key = tuple(sorted(config.items()))
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ThreadedConnectionPool(
+                POOL_MIN_CONNECTIONS, POOL_MAX_CONNECTIONS, **config
+            )
+            _POOLS[key] = pool
+    return pool
+
+def close_connection_pools():
+    """Close every pooled database connection (e.g. on shutdown)."""
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.closeall()
+        _POOLS.clear()
+
+# Columns stored as DECIMAL; transformation keeps some of them as float32,
+# which psycopg2 cannot adapt, so they are written as float64
+FLOAT_COLUMNS = (
+    'latitude', 'longitude',
+    'temperature', 'feels_like', 'temp_min', 'temp_max',
+    'wind_speed'
+)
+
+def _table_frame(df):
+    """
+    Select the weather_data columns, in table order, with integer columns
+    as nullable integers so missing values are written as NULL and
+    decimal columns as float64.
+    
+    Parameters:
+        df (pandas.DataFrame): Weather data
+    
+    Returns:
+        pandas.DataFrame: Columns ready to be written to weather_data
+    """
+    
+    frame = df[list(WEATHER_COLUMNS)]
+    dtypes = {col: 'Int64' for col in INTEGER_COLUMNS}
+    dtypes.update({col: 'float64' for col in FLOAT_COLUMNS})
+    return frame.astype(dtypes)
+
 class WeatherDatabase:
     """
     Class to handle all database operations for weather data.
@@ -33,33 +162,59 @@ class WeatherDatabase:
         self.cursor = None
     
     def connect(self):
-        """Establish connection to PostgreSQL database."""
+        """Check out a connection to PostgreSQL from the shared pool."""
         try:
-            self.connection = psycopg2.connect(
-                host=self.config['host'],
-                database=self.config['database'],
-                user=self.config['user'],
-                password=self.config['password']
-            )
+            self.connection = _get_pool(self.config).getconn()
+            # Statements run in explicit transactions, ended by commit()
+            self.connection.autocommit = False
             self.cursor = self.connection.cursor()
+            
+            # Prepared statements live as long as the server session, so
+            # only prepare on connections that haven't been used before
+            if self.connection not in _PREPARED_CONNECTIONS:
+                self.cursor.execute(PREPARE_INSERT_QUERY)
+                self.connection.commit()
+                _PREPARED_CONNECTIONS.add(self.connection)
+            
             logger.info("✅ Connected to database")
             return True
         except Exception as e:
+            # Don't leak a checked-out connection: callers only disconnect
+            # after a successful connect. It is closed rather than reused
+            # since its session may be in a failed state.
+            if self.cursor:
+                self.cursor.close()
+                self.cursor = None
+            if self.connection:
+                _get_pool(self.config).putconn(self.connection, close=True)
+                self.connection = None
             logger.error(f"❌ Failed to connect to database: {str(e)}")
             return False
     
     def disconnect(self):
-        """Close database connection."""
+        """Return the database connection to the shared pool."""
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.connection:
-            self.connection.close()
+            _get_pool(self.config).putconn(self.connection)
+            self.connection = None
         logger.info("🔌 Disconnected from database")
     
     def insert_weather_data(self, df):
         """
         Insert weather data from DataFrame into database.
         
+        The whole batch is written in a single transaction with
+        synchronous_commit turned off for it. The commit returns before
+        the WAL is flushed to disk, so a database crash can lose the last
+        batch (but never corrupts data). That is acceptable here: the next
+        fetch is only minutes away.
+        
+        The rows are not visible to get_latest_weather or
+        get_statistics_all until the materialized views are refreshed
+        (see refresh_materialized_views; save_weather_data does this).
+        
         Parameters:
             df (pandas.DataFrame): Weather data to insert
         
@@ -72,37 +227,23 @@ class WeatherDatabase:
             return 0
         
         try:
-            # Prepare INSERT query
-            insert_query = """
-            INSERT INTO weather_data (
-                timestamp, city, country_code, latitude, longitude,
-                temperature, feels_like, temp_min, temp_max,
-                pressure, humidity,
-                weather_main, weather_description, weather_icon,
-                wind_speed, wind_direction,
-                cloudiness, visibility,
-                api_timestamp, timezone_offset,
-                data_source, is_valid
-            ) VALUES (
-                %(timestamp)s, %(city)s, %(country_code)s, %(latitude)s, %(longitude)s,
-                %(temperature)s, %(feels_like)s, %(temp_min)s, %(temp_max)s,
-                %(pressure)s, %(humidity)s,
-                %(weather_main)s, %(weather_description)s, %(weather_icon)s,
-                %(wind_speed)s, %(wind_direction)s,
-                %(cloudiness)s, %(visibility)s,
-                %(api_timestamp)s, %(timezone_offset)s,
-                %(data_source)s, %(is_valid)s
-            )
-            """
-            
-            # Convert DataFrame to list of dictionaries
-            records = df.to_dict('records')
+            # Applies to this transaction only
+            self.cursor.execute("SET LOCAL synchronous_commit = off")
             
-            # Insert each record
-            rows_inserted = 0
-            for record in records:
-                self.cursor.execute(insert_query, record)
-                rows_inserted += 1
+            if len(df) >= COPY_THRESHOLD:
+                # Large batches go through Postgres's bulk loader
+                rows_inserted = self._copy_insert(df)
+            else:
+                # Stream plain row tuples in column order straight into the
+                # batch; no per-row dicts or intermediate list are built
+                frame = _table_frame(df)
+                frame = frame.astype(object).where(frame.notna(), None)  # NaN -> NULL
+                rows = frame.itertuples(index=False, name=None)
+                
+                # Run the prepared INSERT for the whole batch, sending
+                # up to 500 EXECUTEs per round-trip
+                extras.execute_batch(self.cursor, EXECUTE_INSERT_QUERY, rows, page_size=500)
+                rows_inserted = len(df)
             
             # Commit the transaction
             self.connection.commit()
@@ -115,29 +256,53 @@ class WeatherDatabase:
             logger.error(f"❌ Error inserting data: {str(e)}")
             return 0
     
+    def _copy_insert(self, df):
+        """
+        Bulk load a DataFrame with COPY ... FROM STDIN.
+        
+        Parameters:
+            df (pandas.DataFrame): Weather data to insert
+        
+        Returns:
+            int: Number of rows copied
+        """
+        
+        # Serialize the batch to an in-memory CSV buffer
+        buf = io.StringIO()
+        _table_frame(df).to_csv(buf, index=False, header=False, na_rep='\\N')
+        buf.seek(0)
+        
+        self.cursor.copy_expert(COPY_QUERY, buf)
+        return len(df)
+    
     def get_latest_weather(self, city=None):
         """
         Get the most recent weather data.
+        Reads mv_latest_weather, so rows inserted since the last
+        refresh_materialized_views call are not included.
         
         Parameters:
             city (str): Optional city name to filter by
         
         Returns:
-            pandas.DataFrame: Latest weather data
+            dict: Latest record for the city (None if there is none),
+                  when a city is given
+            pandas.DataFrame: Latest record per city, otherwise
         """
         
         try:
             if city:
-                query = """
-                SELECT * FROM weather_data 
-                WHERE city = %s 
-                ORDER BY timestamp DESC 
-                LIMIT 1
-                """
-                df = pd.read_sql(query, self.connection, params=(city,))
-            else:
-                query = "SELECT * FROM latest_weather"
-                df = pd.read_sql(query, self.connection)
+                query = "SELECT * FROM mv_latest_weather WHERE city = %s"
+                # A single row doesn't need the pandas read_sql path
+                with self.connection.cursor(cursor_factory=extras.RealDictCursor) as cursor:
+                    cursor.execute(query, (city,))
+                    row = cursor.fetchone()
+                
+                logger.info(f"✅ Retrieved latest weather record for {city}")
+                return dict(row) if row else None
+            
+            query = "SELECT * FROM mv_latest_weather"
+            df = pd.read_sql(query, self.connection)
             
             logger.info(f"✅ Retrieved {len(df)} latest weather records")
             return df
@@ -162,11 +327,33 @@ class WeatherDatabase:
             query = """
             SELECT * FROM weather_data 
             WHERE city = %s 
-            AND timestamp >= CURRENT_TIMESTAMP - INTERVAL '%s days'
+            AND timestamp >= CURRENT_TIMESTAMP - make_interval(days => %s)
             ORDER BY timestamp DESC
             """
             
-            df = pd.read_sql(query, self.connection, params=(city, days))
+            # Server-side (named) cursor: the result set stays on the
+            # server and is streamed in pages, so client memory is bounded
+            # by the page size rather than the size of the whole history
+            chunks = []
+            columns = None
+            with self.connection.cursor(name='hist_cur') as cursor:
+                cursor.execute(query, (city, days))
+                
+                while True:
+                    rows = cursor.fetchmany(HISTORY_FETCH_SIZE)
+                    if not rows:
+                        break
+                    if columns is None:
+                        # A named cursor only has a description once rows
+                        # have been fetched
+                        columns = [col[0] for col in cursor.description]
+                    chunks.append(pd.DataFrame.from_records(rows, columns=columns, coerce_float=True))
+            
+            if chunks:
+                df = pd.concat(chunks, ignore_index=True)
+            else:
+                df = pd.DataFrame(columns=['id', *WEATHER_COLUMNS])
+            
             logger.info(f"✅ Retrieved {len(df)} historical records for {city}")
             return df
             
@@ -174,9 +361,51 @@ class WeatherDatabase:
             logger.error(f"❌ Error retrieving historical data: {str(e)}")
             return None
     
+    def get_rolling_stats(self, city, window='24h', days=30):
+        """
+        Get rolling mean/std of temperature, humidity and pressure for a city.
+        The raw series is fetched with one indexed range query and the
+        rolling windows are computed in pandas rather than with SQL
+        window functions.
+        
+        Parameters:
+            city (str): City name
+            window (str): Time-based rolling window (e.g. '24h', '6h')
+            days (int): Number of days of history to use
+        
+        Returns:
+            pandas.DataFrame: Columns like 'temperature_mean' and
+                              'temperature_std', indexed by timestamp
+        """
+        
+        try:
+            query = """
+            SELECT timestamp, temperature, humidity, pressure
+            FROM weather_data
+            WHERE city = %s
+            AND timestamp >= CURRENT_TIMESTAMP - make_interval(days => %s)
+            ORDER BY timestamp
+            """
+            
+            df = pd.read_sql(query, self.connection, params=(city, days),
+                             index_col='timestamp', parse_dates=['timestamp'])
+            
+            rolling = df.astype(float).rolling(window).agg(['mean', 'std'])
+            rolling.columns = [f"{col}_{stat}" for col, stat in rolling.columns]
+            
+            logger.info(f"✅ Calculated {window} rolling statistics for {city}")
+            return rolling
+            
+        except Exception as e:
+            logger.error(f"❌ Error calculating rolling statistics: {str(e)}")
+            return None
+    
     def get_statistics(self, city, days=30):
         """
         Get weather statistics for a city.
+        Reads the mv_weather_daily rollup, so the window is whole days.
+        The rollup is refreshed at most every DAILY_VIEW_REFRESH_MINUTES,
+        so the latest rows may be missing from the figures.
         
         Parameters:
             city (str): City name
@@ -186,43 +415,115 @@ class WeatherDatabase:
             dict: Dictionary of statistics
         """
         
+        all_stats = self.get_statistics_all(days=days, cities=[city])
+        if all_stats is None:
+            return None
+        
+        # No rows in the window: report an empty record count
+        return all_stats.get(city, {
+            'record_count': 0,
+            **{key: None for key in STATISTICS_KEYS[1:]}
+        })
+    
+    def get_statistics_all(self, days=30, cities=None):
+        """
+        Get weather statistics for every city in one query.
+        Reads the mv_weather_daily rollup, so the window is whole days.
+        The rollup is refreshed at most every DAILY_VIEW_REFRESH_MINUTES,
+        so the latest rows may be missing from the figures.
+        
+        Parameters:
+            days (int): Number of days to calculate statistics for
+            cities (iterable): Optional city names to restrict to (any
+                iterable, e.g. the CITIES_TO_TRACK tuple)
+        
+        Returns:
+            dict: Statistics dictionary per city name
+        """
+        
         try:
+            # Recombine the daily pre-aggregates instead of scanning
+            # and aggregating the raw table
             query = """
             SELECT 
-                COUNT(*) as record_count,
-                AVG(temperature) as avg_temp,
-                MIN(temperature) as min_temp,
-                MAX(temperature) as max_temp,
-                AVG(humidity) as avg_humidity,
-                AVG(pressure) as avg_pressure,
-                AVG(wind_speed) as avg_wind_speed
-            FROM weather_data
-            WHERE city = %s
-            AND timestamp >= CURRENT_TIMESTAMP - INTERVAL '%s days'
+                city,
+                SUM(record_count)::INTEGER as record_count,
+                SUM(temp_sum) / NULLIF(SUM(temp_count), 0) as avg_temp,
+                MIN(min_temp) as min_temp,
+                MAX(max_temp) as max_temp,
+                SUM(humidity_sum)::NUMERIC / NULLIF(SUM(humidity_count), 0) as avg_humidity,
+                SUM(pressure_sum)::NUMERIC / NULLIF(SUM(pressure_count), 0) as avg_pressure,
+                SUM(wind_speed_sum) / NULLIF(SUM(wind_speed_count), 0) as avg_wind_speed
+            FROM mv_weather_daily
+            WHERE day >= CURRENT_DATE - %s
+            AND (%s IS NULL OR city = ANY(%s))
+            GROUP BY city
             """
             
-            self.cursor.execute(query, (city, days))
-            result = self.cursor.fetchone()
+            # psycopg2 only adapts lists to Postgres arrays (tuples become
+            # a row literal, which ANY() rejects)
+            cities = list(cities) if cities is not None else None
+            self.cursor.execute(query, (days, cities, cities))
             
-            if result:
-                stats = {
-                    'record_count': result[0],
-                    'avg_temp': round(result[1], 2) if result[1] else None,
-                    'min_temp': round(result[2], 2) if result[2] else None,
-                    'max_temp': round(result[3], 2) if result[3] else None,
-                    'avg_humidity': round(result[4], 2) if result[4] else None,
-                    'avg_pressure': round(result[5], 2) if result[5] else None,
-                    'avg_wind_speed': round(result[6], 2) if result[6] else None
+            stats = {}
+            for row in self.cursor.fetchall():
+                values = dict(zip(STATISTICS_KEYS, row[1:]))
+                stats[row[0]] = {
+                    key: round(value, 2) if value is not None and key != 'record_count' else value
+                    for key, value in values.items()
                 }
-                
-                logger.info(f"✅ Calculated statistics for {city}")
-                return stats
             
-            return None
+            logger.info(f"✅ Calculated statistics for {len(stats)} cities")
+            return stats
             
         except Exception as e:
+            self.connection.rollback()
             logger.error(f"❌ Error calculating statistics: {str(e)}")
             return None
+    
+    def refresh_materialized_views(self, include_daily=None):
+        """
+        Refresh the materialized views read by get_latest_weather and
+        get_statistics_all. Call after each ingest batch.
+        
+        mv_latest_weather is refreshed every time. mv_weather_daily
+        aggregates the whole table, so by default it is only refreshed
+        once DAILY_VIEW_REFRESH_MINUTES have passed since its last refresh.
+        
+        Parameters:
+            include_daily (bool): True/False to force/skip the
+                mv_weather_daily refresh (default: on its schedule)
+        
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        
+        key = tuple(sorted(self.config.items()))
+        now = time.monotonic()
+        if include_daily is None:
+            with _DAILY_VIEW_LOCK:
+                last = _DAILY_VIEW_REFRESHED_AT.get(key)
+            include_daily = last is None or now - last >= DAILY_VIEW_REFRESH_MINUTES * 60
+        
+        try:
+            # CONCURRENTLY keeps the views readable while they refresh
+            self.cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_latest_weather")
+            if include_daily:
+                self.cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_weather_daily")
+            self.connection.commit()
+            
+            if include_daily:
+                with _DAILY_VIEW_LOCK:
+                    _DAILY_VIEW_REFRESHED_AT[key] = now
+            
+            logger.info("✅ Refreshed materialized views"
+                        + ("" if include_daily else " (daily rollup not due yet)"))
+            return True
+            
+        except Exception as e:
+            self.connection.rollback()
+            logger.error(f"❌ Error refreshing materialized views: {str(e)}")
+            return False
 
 def save_weather_data(df, db_config=None):
     """
@@ -241,6 +542,8 @@ def save_weather_data(df, db_config=None):
     try:
         if db.connect():
             rows = db.insert_weather_data(df)
+            if rows > 0:
+                db.refresh_materialized_views()
             db.disconnect()
             return rows > 0
         return False
@@ -249,6 +552,40 @@ def save_weather_data(df, db_config=None):
         db.disconnect()
         return False
 
+def save_cache(df, path=CACHE_FILE):
+    """
+    Save a batch of weather data to a local Parquet cache.
+    Columnar + compressed, so it reloads much faster than JSON/CSV.
+    
+    Parameters:
+        df (pandas.DataFrame): Weather data to cache
+        path: Output file (default: CACHE_FILE from config.py)
+    """
+    
+    df.to_parquet(path, compression='zstd', index=False)
+    logger.info(f"💾 Cached {len(df)} rows to {path}")
+
+def load_cache(path=CACHE_FILE):
+    """
+    Load weather data previously saved with save_cache.
+    
+    Parameters:
+        path: Cache file (default: CACHE_FILE from config.py)
+    
+    Returns:
+        pandas.DataFrame: Cached weather data, or None if there is no cache
+    """
+    
+    try:
+        df = pd.read_parquet(path)
+    except FileNotFoundError:
+        logger.warning(f"⚠️ No cache found at {path}")
+        return None
+    
+    # Same text dtype as transformation produces
+    text_columns = [col for col in TEXT_COLUMNS if col in df.columns]
+    return df.astype({col: 'string[pyarrow]' for col in text_columns})
+
 # Test the storage module
 if __name__ == "__main__":
     print("\n🧪 Testing Storage Module")
@@ -3,9 +3,10 @@ Test script to verify that the OpenWeatherMap API key works correctly.
 """
 
 import requests
-import json
+import orjson
 from datetime import datetime
 from config import OPENWEATHER_API_KEY, OPENWEATHER_BASE_URL, DEFAULT_CITY
+from ingestion import SESSION
 
 def test_api_connection():
     """
@@ -32,7 +33,7 @@ def test_api_connection():
 
     try:
         # make the http get request
-        response = requests.get(OPENWEATHER_BASE_URL, params_params, timeout=10)
+        response = SESSION.get(OPENWEATHER_BASE_URL, params=params, timeout=10)
 
         #check the http status code
         # 200 = success, 401= invalid API key, 404 = city not found
@@ -40,7 +41,7 @@ def test_api_connection():
         
         if response.status_code == 200:
             # Success! Parse the JSON response
-            data = response.json()
+            data = orjson.loads(response.content)
             
             print("\n✅ API CONNECTION SUCCESSFUL!")
             print("\n" + "=" * 60)
@@ -64,7 +65,7 @@ def test_api_connection():
             print("📄 RAW JSON RESPONSE:")
             print("=" * 60)
             # Pretty print the full JSON response
-            print(json.dumps(data, indent=2))
+            print(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode())
             
             return True
             
@@ -126,10 +127,10 @@ def test_multiple_cities():
         }
         
         try:
-            response = requests.get(OPENWEATHER_BASE_URL, params=params, timeout=10)
+            response = SESSION.get(OPENWEATHER_BASE_URL, params=params, timeout=10)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 temp = data['main']['temp']
                 weather = data['weather'][0]['description']
                 results[city] = {'temp': temp, 'weather': weather, 'success': True}
@@ -5,23 +5,177 @@ This is the 'Transform' part of the ETL pipeline.
 Cleans and structures raw API data into a format ready for database storage.
 """
 
+import numpy as np
 import pandas as pd
 from datetime import datetime
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+from _fast import validate_kernel
+
+# Set up logging (handlers are configured by the application)
 logger = logging.getLogger(__name__)
 
-def transform_weather_data(raw_data):
+# Plausible ranges used to flag records as invalid (bounds inclusive)
+VALID_RANGES = {
+    'temperature': (-50, 60),   # °C
+    'humidity': (0, 100),       # %
+    'pressure': (800, 1100),    # hPa
+    'wind_speed': (0, 120),     # m/s
+}
+_RANGE_BOUNDS = np.array(list(VALID_RANGES.values()), dtype=np.float64)
+
+# Pressure outside this range (hPa) is logged as unusual but kept valid
+USUAL_PRESSURE = (900, 1100)
+
+# Value of the data_source column
+DATA_SOURCE = 'OpenWeatherMap'
+
+# Batches at least this large are validated by the compiled kernel
+FAST_PATH_MIN_ROWS = 1000
+
+# Columns rounded to 2 decimal places during cleaning
+_DECIMAL_COLUMNS = ('temperature', 'feels_like', 'temp_min', 'temp_max',
+                    'wind_speed', 'latitude', 'longitude')
+
+# Dtypes of the columns in batch frames. The API's readings fit easily
+# in float32 / small ints, which halves the data every vectorized pass has
+# to touch. Latitude/longitude stay float64 as they are stored with 7
+# decimals; integer columns are nullable because fields can be missing.
+_SCHEMA = {
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'temperature': 'float32',
+    'feels_like': 'float32',
+    'temp_min': 'float32',
+    'temp_max': 'float32',
+    'wind_speed': 'float32',
+    'humidity': 'Int16',
+    'pressure': 'Int16',
+    'wind_direction': 'Int16',
+    'cloudiness': 'Int8',
+    'visibility': 'Int32',
+    'api_timestamp': 'Int64',
+    'timezone_offset': 'Int32',
+    
+    # Text as Arrow strings: contiguous buffers instead of one Python
+    # object per cell
+    'city': 'string[pyarrow]',
+    'country_code': 'string[pyarrow]',
+    'weather_main': 'string[pyarrow]',
+    'weather_description': 'string[pyarrow]',
+    'weather_icon': 'string[pyarrow]',
+    'data_source': 'string[pyarrow]',
+}
+
+# Weather conditions we rate, and the severity of each one. The severity
+# table is indexed by the condition's category code.
+_WEATHER_CATEGORIES = pd.CategoricalDtype(
+    ['Clear', 'Clouds', 'Rain', 'Drizzle', 'Thunderstorm', 'Snow', 'Mist', 'Fog']
+)
+_SEVERITY_LEVELS = ['Good', 'Fair', 'Poor', 'Severe']
+_SEVERITY_LUT = np.array([0, 1, 2, 1, 3, 2, 1, 2], dtype=np.int8)  # codes into _SEVERITY_LEVELS
+
+# Bin edges (right-inclusive, sorted) and labels for the derived categories
+_TEMP_EDGES = np.array([0, 10, 20, 30], dtype=np.float32)
+_TEMP_LABELS = ['Freezing', 'Cold', 'Mild', 'Warm', 'Hot']
+_HOUR_EDGES = np.array([6, 12, 18])
+_TIME_OF_DAY_LABELS = ['Night', 'Morning', 'Afternoon', 'Evening']
+_NS_PER_HOUR = 3_600_000_000_000
+
+# Fields pulled from a raw API response, grouped by the section they live
+# in so each section is looked up once: (section path, fields), where
+# each field is (column, key, default). A path step is a dict key, or a
+# list index for the 'weather' list; () is the top level.
+_SPEC = (
+    # Location
+    ((), (('city', 'name', 'Unknown'),)),
+    (('sys',), (('country_code', 'country', None),)),
+    (('coord',), (
+        ('latitude', 'lat', None),
+        ('longitude', 'lon', None),
+    )),
+    
+    # Temperature (already in Celsius because we used units=metric)
+    # and atmospheric readings
+    (('main',), (
+        ('temperature', 'temp', None),
+        ('feels_like', 'feels_like', None),
+        ('temp_min', 'temp_min', None),
+        ('temp_max', 'temp_max', None),
+        ('pressure', 'pressure', None),
+        ('humidity', 'humidity', None),
+    )),
+    
+    # Weather condition (weather is a list, we take the first element)
+    (('weather', 0), (
+        ('weather_main', 'main', None),
+        ('weather_description', 'description', None),
+        ('weather_icon', 'icon', None),
+    )),
+    
+    # Wind
+    (('wind',), (
+        ('wind_speed', 'speed', None),
+        ('wind_direction', 'deg', None),
+    )),
+    
+    # Clouds
+    (('clouds',), (('cloudiness', 'all', None),)),
+    
+    # Visibility and API metadata
+    ((), (
+        ('visibility', 'visibility', None),
+        ('api_timestamp', 'dt', None),
+        ('timezone_offset', 'timezone', None),
+    )),
+)
+_EMPTY = {}  # stand-in for a missing section; never modified
+
+def _pluck(data, path, default):
     """
-    Transforms raw weather API response into a structured DataFrame.
+    Follows a path of keys / list indices into nested JSON.
+    
+    Parameters:
+        data (dict): Raw JSON response
+        path (tuple): Dict keys, or ints for list positions
+        default: Value returned if any step is missing
+    
+    Returns:
+        The value at the end of the path, or default
+    """
+    
+    try:
+        for key in path:
+            data = data[key]
+    except (KeyError, IndexError, TypeError):
+        return default
+    return default if data is None else data
+
+def _section(raw_data, path):
+    """
+    Looks up one section of a raw API response.
+    
+    Parameters:
+        raw_data (dict): Raw JSON response
+        path (tuple): Path to the section, () for the top level
+    
+    Returns:
+        dict: The section, or an empty dict if it is missing
+    """
+    
+    section = _pluck(raw_data, path, _EMPTY)
+    return section if isinstance(section, dict) else _EMPTY
+
+def _extract_record(raw_data):
+    """
+    Extracts the fields we store from a raw weather API response.
+    Pure dict construction, no pandas.
     
     Parameters:
         raw_data (dict): Raw JSON response from OpenWeatherMap API
     
     Returns:
-        pandas.DataFrame: Cleaned and structured weather data
+        dict: One flat weather record
     
     Example input (raw_data):
     {
@@ -34,117 +188,269 @@ def transform_weather_data(raw_data):
     }
     """
     
+    # Timestamp (local time, stored as datetime64[ns] so the column
+    # needs no conversion later)
+    record = {'timestamp': np.datetime64(datetime.now(), 'ns')}
+    
+    # Look each section up once, then read its fields (handles missing fields)
+    for path, fields in _SPEC:
+        section = _section(raw_data, path)
+        for name, key, default in fields:
+            value = section.get(key)
+            record[name] = default if value is None else value
+    
+    # Data quality
+    record['data_source'] = DATA_SOURCE
+    record['is_valid'] = True  # set properly by validate_df
+    return record
+
+def _extract_columns(raw_data_list):
+    """
+    Extracts a batch of raw API responses into columns, one array per
+    field, already in its _SCHEMA dtype. Building the DataFrame from typed
+    columns skips pandas' per-value type inference and a later astype.
+    All records share the batch's collection time.
+    
+    Parameters:
+        raw_data_list (list): Raw JSON responses from OpenWeatherMap API
+    
+    Returns:
+        dict: Column name -> array, in table order
+    """
+    
+    count = len(raw_data_list)
+    columns = {'timestamp': np.full(count, np.datetime64(datetime.now(), 'ns'))}
+    
+    for path, fields in _SPEC:
+        sections = [_section(raw_data, path) for raw_data in raw_data_list]
+        for name, key, default in fields:
+            values = [section.get(key) for section in sections]
+            if default is not None:
+                values = [default if value is None else value for value in values]
+            columns[name] = _typed_array(name, values)
+    
+    columns['data_source'] = _typed_array('data_source', [DATA_SOURCE] * count)
+    columns['is_valid'] = np.ones(count, dtype=bool)
+    return columns
+
+def _typed_array(name, values):
+    """
+    Builds one column from a list of values (None for missing), in the
+    column's _SCHEMA dtype.
+    
+    Parameters:
+        name (str): Column name
+        values (list): Column values
+    
+    Returns:
+        numpy.ndarray or pandas array: The column
+    """
+    
+    dtype = _SCHEMA[name]
     try:
-        # Extract data with safe navigation (handle missing fields)
-        transformed = {
-            # Timestamp
-            'timestamp': datetime.now(),
-            
-            # Location
-            'city': raw_data.get('name', 'Unknown'),
-            'country_code': raw_data.get('sys', {}).get('country', None),
-            'latitude': raw_data.get('coord', {}).get('lat', None),
-            'longitude': raw_data.get('coord', {}).get('lon', None),
-            
-            # Temperature (already in Celsius because we used units=metric)
-            'temperature': raw_data.get('main', {}).get('temp', None),
-            'feels_like': raw_data.get('main', {}).get('feels_like', None),
-            'temp_min': raw_data.get('main', {}).get('temp_min', None),
-            'temp_max': raw_data.get('main', {}).get('temp_max', None),
-            
-            # Atmospheric
-            'pressure': raw_data.get('main', {}).get('pressure', None),
-            'humidity': raw_data.get('main', {}).get('humidity', None),
-            
-            # Weather condition
-            # weather is a list, we take the first element
-            'weather_main': raw_data.get('weather', [{}])[0].get('main', None),
-            'weather_description': raw_data.get('weather', [{}])[0].get('description', None),
-            'weather_icon': raw_data.get('weather', [{}])[0].get('icon', None),
-            
-            # Wind
-            'wind_speed': raw_data.get('wind', {}).get('speed', None),
-            'wind_direction': raw_data.get('wind', {}).get('deg', None),
-            
-            # Clouds
-            'cloudiness': raw_data.get('clouds', {}).get('all', None),
-            
-            # Visibility
-            'visibility': raw_data.get('visibility', None),
-            
-            # API metadata
-            'api_timestamp': raw_data.get('dt', None),
-            'timezone_offset': raw_data.get('timezone', None),
-            
-            # Data quality
-            'data_source': 'OpenWeatherMap',
-            'is_valid': True  # We'll add validation logic later
-        }
-        
-        # Create DataFrame from single record
-        df = pd.DataFrame([transformed])
-        
-        # Data validation and cleaning
-        df = validate_and_clean(df)
-        
-        logger.info(f"✅ Transformed data for {transformed['city']}")
-        return df
-        
-    except Exception as e:
-        logger.error(f"❌ Error transforming data: {str(e)}")
+        if dtype.startswith('float'):
+            return np.array(values, dtype=dtype)  # None -> NaN
+        return pd.array(values, dtype=dtype)
+    except (ValueError, TypeError, OverflowError):
+        # An odd value (e.g. 1013.5 or '75' for an integer field) must not
+        # sink the whole batch: coerce what parses, the rest becomes missing
+        logger.warning("⚠️ Unexpected values in %s, coercing", name)
+        return _coerce_numeric(values, dtype)
+
+def _coerce_numeric(values, dtype):
+    """
+    Converts messy numeric values to dtype. Unparseable or out-of-range
+    values become missing; integer columns are rounded.
+    
+    Parameters:
+        values (list): Column values
+        dtype (str): Numeric target dtype from _SCHEMA
+    
+    Returns:
+        numpy.ndarray or pandas array: The column
+    """
+    
+    numeric = pd.to_numeric(pd.Series(values, dtype=object), errors='coerce')
+    if dtype.startswith('float'):
+        return numeric.to_numpy(dtype=dtype, na_value=np.nan)
+    
+    limits = np.iinfo(pd.api.types.pandas_dtype(dtype).numpy_dtype)
+    numeric = numeric.round().where(numeric.between(limits.min, limits.max))
+    return pd.array(numeric.to_numpy(dtype=np.float64, na_value=np.nan), dtype=dtype)
+
+def _is_response(raw_data):
+    """
+    Whether raw_data looks like an API response: a non-empty dict.
+    Used by both the single-record and the batch transform.
+    
+    Parameters:
+        raw_data: One entry as returned by the ingestion module
+    
+    Returns:
+        bool: True if it can be extracted
+    """
+    return isinstance(raw_data, dict) and bool(raw_data)
+
+def transform_weather_data(raw_data):
+    """
+    Transforms raw weather API response into a structured DataFrame.
+    
+    Parameters:
+        raw_data (dict): Raw JSON response from OpenWeatherMap API
+    
+    Returns:
+        pandas.DataFrame: Cleaned and structured weather data, or None if
+            raw_data is not an API response (not a dict, or empty)
+    """
+    
+    # Missing sections are handled during extraction, so the only input
+    # we reject is something that isn't a response at all
+    if not _is_response(raw_data):
+        logger.error("❌ Error transforming data: not an API response (%s)",
+                     type(raw_data).__name__)
         return None
+    
+    transformed = _extract_record(raw_data)
+    
+    # Create DataFrame from single record
+    df = pd.DataFrame([transformed])
+    
+    # Data validation and cleaning
+    df = validate_and_clean(df)
+    
+    logger.info("✅ Transformed data for %s", transformed['city'])
+    return df
 
-def validate_and_clean(df):
+def validate_and_clean(df, inplace=True):
     """
     Validates and cleans the transformed data.
     
     Parameters:
         df (pandas.DataFrame): Transformed weather data
+        inplace (bool): Modify df itself (the default). Pass False to
+            leave the caller's DataFrame untouched and work on a copy.
     
     Returns:
         pandas.DataFrame: Validated and cleaned data
     """
     
-    # Make a copy to avoid modifying the original
-    df = df.copy()
-    
-    # 1. Check for reasonable temperature ranges (-50°C to 60°C)
-    if df['temperature'].notna().any():
-        temp = df['temperature'].iloc[0]
-        if temp < -50 or temp > 60:
-            logger.warning(f"⚠️ Unusual temperature detected: {temp}°C")
-            df['is_valid'] = False
-    
-    # 2. Humidity should be 0-100%
-    if df['humidity'].notna().any():
-        humidity = df['humidity'].iloc[0]
-        if humidity < 0 or humidity > 100:
-            logger.warning(f"⚠️ Invalid humidity: {humidity}%")
-            df.loc[df['humidity'] < 0, 'humidity'] = 0
-            df.loc[df['humidity'] > 100, 'humidity'] = 100
-    
-    # 3. Pressure should be reasonable (900-1100 hPa)
-    if df['pressure'].notna().any():
-        pressure = df['pressure'].iloc[0]
-        if pressure < 900 or pressure > 1100:
-            logger.warning(f"⚠️ Unusual pressure: {pressure} hPa")
-    
-    # 4. Wind speed shouldn't be negative
-    if df['wind_speed'].notna().any():
-        if df['wind_speed'].iloc[0] < 0:
-            logger.warning(f"⚠️ Negative wind speed detected, setting to 0")
-            df['wind_speed'] = 0
-    
-    # 5. Round decimal values to 2 places
-    decimal_columns = ['temperature', 'feels_like', 'temp_min', 'temp_max', 
-                      'wind_speed', 'latitude', 'longitude']
-    for col in decimal_columns:
-        if col in df.columns:
-            df[col] = df[col].round(2)
+    # Every check below works on whole columns, so it is correct for
+    # batches of any size. Columns are replaced individually rather than
+    # copying the whole frame up front.
+    if not inplace:
+        df = df.copy()
+    
+    # 1-4. Range checks and clipping. Large batches run them in one
+    # compiled pass; otherwise each check is a pandas column operation.
+    if len(df) >= FAST_PATH_MIN_ROWS and all(col in df.columns for col in VALID_RANGES):
+        invalid_count, humidity_out, pressure_out, wind_negative = _validate_fast(df)
+    else:
+        # 1. Flag records with out-of-range readings (all rows at once)
+        df = validate_df(df)
+        invalid_count = (~df['is_valid']).sum()
+        
+        # 2. Humidity should be 0-100%
+        humidity_out = ((df['humidity'] < 0) | (df['humidity'] > 100)).sum()
+        if humidity_out:
+            df['humidity'] = df['humidity'].clip(lower=0, upper=100)
+        
+        # 3. Pressure should be reasonable (900-1100 hPa)
+        low, high = USUAL_PRESSURE
+        pressure_out = ((df['pressure'] < low) | (df['pressure'] > high)).sum()
+        
+        # 4. Wind speed shouldn't be negative
+        wind_negative = (df['wind_speed'] < 0).sum()
+        if wind_negative:
+            df['wind_speed'] = df['wind_speed'].clip(lower=0)
+    
+    if invalid_count:
+        logger.warning("⚠️ %d record(s) with out-of-range readings marked invalid", invalid_count)
+    if humidity_out:
+        logger.warning("⚠️ Invalid humidity in %d record(s), clipping to 0-100%%", humidity_out)
+    if pressure_out:
+        logger.warning("⚠️ Unusual pressure in %d record(s)", pressure_out)
+    if wind_negative:
+        logger.warning("⚠️ Negative wind speed in %d record(s), setting to 0", wind_negative)
+    
+    # 5. Round decimal values to 2 places (one call for all columns)
+    present = [col for col in _DECIMAL_COLUMNS if col in df.columns]
+    df[present] = df[present].round(2)
     
     logger.info("✅ Data validation completed")
     return df
 
+def _validate_fast(df):
+    """
+    Runs the range checks and clipping of validate_and_clean through the
+    compiled kernel in _fast, writing the results back to df.
+    
+    Parameters:
+        df (pandas.DataFrame): Weather data with all VALID_RANGES columns
+    
+    Returns:
+        tuple: Counts of invalid rows, humidity out of range, unusual
+            pressure and negative wind speed
+    """
+    
+    temp, humidity, pressure, wind = (
+        df[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in VALID_RANGES
+    )
+    is_valid = np.empty(len(df), dtype=bool)
+    counts = validate_kernel(temp, humidity, pressure, wind,
+                             _RANGE_BOUNDS, USUAL_PRESSURE, is_valid)
+    
+    df['is_valid'] = is_valid
+    if counts[1]:
+        df['humidity'] = _restore_dtype(humidity, df['humidity'].dtype)
+    if counts[3]:
+        df['wind_speed'] = _restore_dtype(wind, df['wind_speed'].dtype)
+    return counts
+
+def _restore_dtype(values, dtype):
+    """
+    Converts a float kernel output back to its column's dtype. Nullable
+    integers are rebuilt from values + NaN mask, which skips the checked
+    float -> int cast pandas would otherwise do.
+    
+    Parameters:
+        values (numpy.ndarray): float64 values, NaN for missing
+        dtype: The column's original dtype
+    
+    Returns:
+        array-like: values as dtype
+    """
+    
+    if pd.api.types.is_extension_array_dtype(dtype) and pd.api.types.is_integer_dtype(dtype):
+        missing = np.isnan(values)
+        return pd.arrays.IntegerArray(
+            np.where(missing, 0, values).astype(dtype.numpy_dtype), missing
+        )
+    return values.astype(dtype)
+
+def validate_df(df):
+    """
+    Sets the is_valid flag for every row using vectorized range checks.
+    A row is invalid if any reading in VALID_RANGES is outside its range;
+    missing readings are not treated as invalid.
+    
+    Parameters:
+        df (pandas.DataFrame): Weather data
+    
+    Returns:
+        pandas.DataFrame: The same DataFrame with is_valid set
+    """
+    
+    # Plain numpy bool masks, so the flag is a bool column whatever the
+    # readings' dtypes (nullable ints would otherwise make it 'boolean')
+    is_valid = np.ones(len(df), dtype=bool)
+    for col, (low, high) in VALID_RANGES.items():
+        if col in df.columns:
+            in_range = df[col].between(low, high).to_numpy(dtype=bool, na_value=True)
+            is_valid &= in_range | df[col].isna().to_numpy()
+    
+    df['is_valid'] = is_valid
+    return df
+
 def transform_multiple_cities(raw_data_list):
     """
     Transforms weather data for multiple cities.
@@ -156,79 +462,163 @@ def transform_multiple_cities(raw_data_list):
         pandas.DataFrame: Combined DataFrame with all cities
     """
     
-    all_dataframes = []
-    
-    for raw_data in raw_data_list:
-        df = transform_weather_data(raw_data)
-        if df is not None:
-            all_dataframes.append(df)
-    
-    if all_dataframes:
-        # Combine all DataFrames into one
-        combined_df = pd.concat(all_dataframes, ignore_index=True)
-        logger.info(f"✅ Transformed {len(combined_df)} records")
+    try:
+        # Only real responses become rows; failed fetches come through as
+        # None or, from asyncio.gather, as exception objects
+        responses = []
+        for raw_data in raw_data_list:
+            if _is_response(raw_data):
+                responses.append(raw_data)
+            else:
+                logger.warning("⚠️ Skipping entry that is not an API response: %s",
+                               type(raw_data).__name__)
+        raw_data_list = responses
+        
+        if not raw_data_list:
+            logger.error("❌ No data to transform")
+            return None
+        
+        # Build one DataFrame for the whole batch, column by column.
+        # Extraction stays in this process: pickling the raw responses to
+        # worker processes costs more than extracting them here, and the
+        # I/O-bound part (fetching) is already concurrent in ingestion.
+        combined_df = pd.DataFrame(_extract_columns(raw_data_list), copy=False)
+        
+        # Validate and clean all rows at once
+        combined_df = validate_and_clean(combined_df)
+        
+        logger.info("✅ Transformed %d records", len(combined_df))
         return combined_df
-    else:
-        logger.error("❌ No data to transform")
+        
+    except Exception as e:
+        logger.error("❌ Error transforming data: %s", e)
         return None
 
-def add_calculated_fields(df):
+def _float_values(series):
+    """
+    The values of a numeric column as a float numpy array, NaN for
+    missing. Float columns are returned as they are, without a copy.
+    
+    Parameters:
+        series (pandas.Series): Numeric column
+    
+    Returns:
+        numpy.ndarray: Float values
+    """
+    
+    values = series.to_numpy()
+    if values.dtype.kind != 'f':
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    return values
+
+def _bucket_codes(values, edges):
+    """
+    Bucket index of each value for sorted, right-inclusive edges: the
+    number of edges the value is above. One vectorized comparison per
+    edge, which beats np.digitize's binary search for a handful of edges.
+    
+    Parameters:
+        values (numpy.ndarray): Values to bucket (NaN lands in bucket 0)
+        edges (numpy.ndarray): Sorted bin edges
+    
+    Returns:
+        numpy.ndarray: int8 bucket codes, 0 to len(edges)
+    """
+    
+    codes = np.zeros(len(values), dtype=np.int8)
+    for edge in edges:
+        codes += values > edge
+    return codes
+
+def add_calculated_fields(df, inplace=True):
     """
     Adds calculated/derived fields to the DataFrame.
     
+    The new columns are added to df itself by default, so the caller
+    should own the frame it passes in (not a slice of another one).
+    All derived columns are computed first; with inplace=False they are
+    attached in a single assign(), while the in-place path still inserts
+    them into df one column at a time.
+    
     Parameters:
         df (pandas.DataFrame): Weather data
+        inplace (bool): Add the columns to df (the default). Pass False to
+            get a new DataFrame and leave df unchanged.
     
     Returns:
         pandas.DataFrame: DataFrame with additional calculated fields
     """
     
-    df = df.copy()
+    # Derived columns are built as arrays first and attached at the end
+    derived = {}
     
     # 1. Temperature difference (actual vs feels like)
+    # Steps 1-2 are plain numpy arithmetic on the column buffers, with no
+    # intermediate Series or index alignment
     if 'temperature' in df.columns and 'feels_like' in df.columns:
-        df['temp_feels_diff'] = (df['temperature'] - df['feels_like']).round(2)
+        derived['temp_feels_diff'] = np.round(
+            _float_values(df['temperature']) - _float_values(df['feels_like']), 2
+        )
     
     # 2. Temperature range
     if 'temp_max' in df.columns and 'temp_min' in df.columns:
-        df['temp_range'] = (df['temp_max'] - df['temp_min']).round(2)
+        derived['temp_range'] = np.round(
+            _float_values(df['temp_max']) - _float_values(df['temp_min']), 2
+        )
     
     # 3. Categorize temperature
+    # Fixed edges, so bucket with plain comparisons rather than building
+    # pd.cut's interval index on every call
     if 'temperature' in df.columns:
-        df['temp_category'] = pd.cut(
-            df['temperature'],
-            bins=[-float('inf'), 0, 10, 20, 30, float('inf')],
-            labels=['Freezing', 'Cold', 'Mild', 'Warm', 'Hot']
+        temps = _float_values(df['temperature'])
+        codes = _bucket_codes(temps, _TEMP_EDGES)
+        codes[np.isnan(temps)] = -1  # missing -> NaN category
+        derived['temp_category'] = pd.Categorical.from_codes(
+            codes, categories=_TEMP_LABELS, ordered=True
         )
     
     # 4. Categorize weather conditions
+    # Conditions become category codes, which index straight into the
+    # severity table; unknown conditions (code -1) get no severity
     if 'weather_main' in df.columns:
-        weather_severity = {
-            'Clear': 'Good',
-            'Clouds': 'Fair',
-            'Rain': 'Poor',
-            'Drizzle': 'Fair',
-            'Thunderstorm': 'Severe',
-            'Snow': 'Poor',
-            'Mist': 'Fair',
-            'Fog': 'Poor'
-        }
-        df['weather_severity'] = df['weather_main'].map(weather_severity)
+        codes = df['weather_main'].astype(_WEATHER_CATEGORIES).cat.codes.to_numpy()
+        severity_codes = np.where(codes >= 0, _SEVERITY_LUT[codes], -1)
+        derived['weather_severity'] = pd.Categorical.from_codes(
+            severity_codes, categories=_SEVERITY_LEVELS
+        )
     
     # 5. Time of day (from timestamp)
     if 'timestamp' in df.columns:
-        df['hour'] = pd.to_datetime(df['timestamp']).dt.hour
-        df['time_of_day'] = pd.cut(
-            df['hour'],
-            bins=[-1, 6, 12, 18, 24],
-            labels=['Night', 'Morning', 'Afternoon', 'Evening']
+        # Hour straight from the int64 nanosecond buffer. Converting a
+        # tz-aware column to datetime64 would give UTC, so drop the zone
+        # first to keep the local wall-clock time.
+        timestamps = df['timestamp']
+        if isinstance(timestamps.dtype, pd.DatetimeTZDtype):
+            timestamps = timestamps.dt.tz_localize(None)
+        ts_i8 = timestamps.to_numpy(dtype='datetime64[ns]').view('i8')
+        hours = (ts_i8 // _NS_PER_HOUR % 24).astype(np.int8)
+        derived['hour'] = hours
+        derived['time_of_day'] = pd.Categorical.from_codes(
+            _bucket_codes(hours, _HOUR_EDGES),
+            categories=_TIME_OF_DAY_LABELS, ordered=True
         )
     
+    # 6. Attach the derived columns. assign() builds the new frame in one
+    # step; pandas has no single-step in-place insert of several columns
+    # (df[cols] = frame loops too), so the in-place path sets them one by one
+    if inplace:
+        for name, values in derived.items():
+            df[name] = values
+    else:
+        df = df.assign(**derived)
+    
     logger.info("✅ Added calculated fields")
     return df
 
 # Test the transformation module
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    
     print("\n🧪 Testing Transformation Module")
     print("=" * 60)
     
@@ -268,7 +658,7 @@ if __name__ == "__main__":
         print(df.T)  # Transpose to show as rows
         
         print("\n📊 With Calculated Fields:")
-        df_enhanced = add_calculated_fields(df)
+        df_enhanced = add_calculated_fields(df, inplace=False)
         print(df_enhanced[['city', 'temperature', 'temp_category', 
                           'weather_main', 'weather_severity']].T)
     
@@ -5,16 +5,27 @@ Tests each component: ingestion, transformation, and storage.
 """
 
 import unittest
-import sys
-import os
 from datetime import datetime
 
-# Add parent directory to path to import modules
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# src/ is put on the import path by pytest.ini (pythonpath = src)
+from ingestion import fetch_weather_data, _fetch, _retry_delay, MAX_RETRY_DELAY
+from transformation import (transform_weather_data, transform_multiple_cities,
+                                validate_and_clean, add_calculated_fields)
+from config import OPENWEATHER_API_KEY
 
-from src.ingestion import fetch_weather_data
-from src.transformation import transform_weather_data, validate_and_clean
-from src.config import OPENWEATHER_API_KEY
+class TestImports(unittest.TestCase):
+    """
+    Smoke tests: every pipeline module must import cleanly.
+    """
+    
+    def test_modules_import(self):
+        """Test that each module in src/ can be imported."""
+        import importlib
+        
+        for module in ['config', 'ingestion', 'transformation',
+                       'storage', 'test_api', '_fast']:
+            with self.subTest(module=module):
+                self.assertIsNotNone(importlib.import_module(module))
 
 class TestIngestion(unittest.TestCase):
     """
@@ -45,6 +56,35 @@ class TestIngestion(unittest.TestCase):
         self.assertIsNotNone(OPENWEATHER_API_KEY, "API key must be configured")
         self.assertTrue(len(OPENWEATHER_API_KEY) > 0, "API key must not be empty")
 
+    def test_retry_delay(self):
+        """Test the backoff delay and how it honours Retry-After."""
+        # Exponential backoff from RETRY_BACKOFF_FACTOR
+        self.assertEqual([_retry_delay(n) for n in range(3)], [0.3, 0.6, 1.2])
+        # A numeric Retry-After wins when it is longer than the backoff
+        self.assertEqual(_retry_delay(0, '2'), 2.0)
+        self.assertEqual(_retry_delay(2, '1'), 1.2)
+        # An HTTP-date (or other non-numeric) Retry-After is ignored
+        self.assertEqual(_retry_delay(1, 'Wed, 21 Oct 2015 07:28:00 GMT'), 0.6)
+        # Both are capped at MAX_RETRY_DELAY
+        self.assertEqual(_retry_delay(10), MAX_RETRY_DELAY)
+        self.assertEqual(_retry_delay(0, '3600'), MAX_RETRY_DELAY)
+    
+    def test_fetch_does_not_retry_client_errors(self):
+        """Test that a 404 is returned as a failure without retrying."""
+        import asyncio
+        from unittest import mock
+        
+        response = mock.MagicMock(status=404)
+        session = mock.MagicMock()
+        session.get.return_value.__aenter__.return_value = response
+        
+        with mock.patch('ingestion.asyncio.sleep') as sleep:
+            result = asyncio.run(_fetch(session, 'NoSuchCity404'))
+        
+        self.assertIsNone(result)
+        self.assertEqual(session.get.call_count, 1)
+        sleep.assert_not_called()
+
 class TestTransformation(unittest.TestCase):
     """
     Tests for the data transformation module.
@@ -97,6 +137,34 @@ class TestTransformation(unittest.TestCase):
         self.assertEqual(df.iloc[0]['temperature'], 7.2, "Temperature should match")
         self.assertEqual(df.iloc[0]['humidity'], 75, "Humidity should match")
     
+    def test_transform_batch_with_malformed_record(self):
+        """Test that one odd record doesn't discard the rest of the batch."""
+        import copy
+        import pandas as pd
+        
+        bad = copy.deepcopy(self.sample_data)
+        bad['name'] = 'Broken'
+        bad['main'].update(pressure=1013.5, humidity='75', temp='n/a')
+        
+        df = transform_multiple_cities([self.sample_data, bad])
+        
+        self.assertIsNotNone(df, "Batch should still be transformed")
+        self.assertEqual(df['city'].tolist(), ['Toronto', 'Broken'])
+        broken = df.iloc[1]
+        self.assertEqual(broken['pressure'], 1014)
+        self.assertEqual(broken['humidity'], 75)
+        self.assertTrue(pd.isna(broken['temperature']))
+    
+    def test_transform_batch_skips_non_responses(self):
+        """Test that failed fetches in a batch don't become rows."""
+        df = transform_multiple_cities(
+            [self.sample_data, "oops", RuntimeError("timeout"), None, {}]
+        )
+        
+        self.assertIsNotNone(df, "Batch should still be transformed")
+        self.assertEqual(df['city'].tolist(), ['Toronto'])
+        self.assertIsNone(transform_multiple_cities(["oops", None]))
+    
     def test_validation_temperature_range(self):
         """Test that temperature validation works."""
         import pandas as pd
@@ -141,6 +209,95 @@ class TestTransformation(unittest.TestCase):
         self.assertLessEqual(validated_df.iloc[0]['humidity'], 100,
                             "Humidity should be capped at 100%")
 
+    def test_validation_multiple_rows(self):
+        """Test that validation checks every row, not just the first."""
+        import pandas as pd
+        
+        test_df = pd.DataFrame([
+            {'temperature': 20.0, 'humidity': 50, 'pressure': 1013,
+             'wind_speed': 5.0, 'is_valid': True},
+            {'temperature': 100.0, 'humidity': 150, 'pressure': 1013,
+             'wind_speed': -2.0, 'is_valid': True},
+        ])
+        
+        validated_df = validate_and_clean(test_df)
+        
+        # Only the second row is out of range
+        self.assertEqual(validated_df['is_valid'].tolist(), [True, False])
+        # Cleaning applies per row
+        self.assertEqual(validated_df['humidity'].tolist(), [50, 100])
+        self.assertEqual(validated_df['wind_speed'].tolist(), [5.0, 0.0])
+
+    def test_validation_fast_path(self):
+        """Test that the compiled path gives the same result as pandas."""
+        import pandas as pd
+        from unittest import mock
+        
+        test_df = pd.DataFrame({
+            'temperature': [20.0, 100.0, None, -10.0],
+            'humidity': pd.array([50, 150, None, -5], dtype='Int16'),
+            'pressure': pd.array([1013, 1013, 850, None], dtype='Int16'),
+            'wind_speed': [5.0, -2.0, None, 130.0],
+            'is_valid': True,
+        })
+        
+        expected = validate_and_clean(test_df.copy())
+        with mock.patch('transformation.FAST_PATH_MIN_ROWS', 0):
+            result = validate_and_clean(test_df.copy())
+        
+        self.assertEqual(result['is_valid'].tolist(), [True, False, True, False])
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_calculated_fields_edges(self):
+        """Test the derived categories at their bin edges."""
+        import numpy as np
+        import pandas as pd
+        
+        test_df = pd.DataFrame({
+            'temperature': np.array([0, 0.01, 10, 20, 30, np.nan], dtype=np.float32),
+            'weather_main': pd.array(['Clear', 'Rain', 'Tornado', 'Snow', None, 'Fog'],
+                                     dtype='string[pyarrow]'),
+            'timestamp': pd.to_datetime(['2024-01-01 06:00', '2024-01-01 07:00',
+                                         '2024-01-01 12:00', '2024-01-01 18:00',
+                                         '2024-01-01 19:00', '2024-01-01 00:30']),
+        })
+        original = test_df.copy()
+        
+        result = add_calculated_fields(test_df, inplace=False)
+        
+        # inplace=False leaves the input frame untouched
+        pd.testing.assert_frame_equal(test_df, original)
+        
+        # Temperature bins are right-inclusive: 0 is Freezing, 0.01 is Cold
+        self.assertEqual(
+            result['temp_category'].tolist(),
+            ['Freezing', 'Cold', 'Cold', 'Mild', 'Warm', np.nan]
+        )
+        self.assertEqual(result['hour'].tolist(), [6, 7, 12, 18, 19, 0])
+        self.assertEqual(
+            result['time_of_day'].tolist(),
+            ['Night', 'Morning', 'Morning', 'Afternoon', 'Evening', 'Night']
+        )
+        # Unknown and missing conditions get no severity
+        self.assertEqual(
+            result['weather_severity'].tolist(),
+            ['Good', 'Poor', np.nan, 'Poor', np.nan, 'Poor']
+        )
+
+    def test_calculated_fields_tz_aware_hour(self):
+        """Test that tz-aware timestamps give the local hour, not UTC."""
+        import pandas as pd
+        
+        test_df = pd.DataFrame({
+            'timestamp': pd.to_datetime(['2024-07-01 10:30', '2024-01-01 23:15'])
+                           .tz_localize('America/Toronto'),
+        })
+        
+        result = add_calculated_fields(test_df)
+        
+        self.assertEqual(result['hour'].tolist(), [10, 23])
+        self.assertEqual(result['time_of_day'].tolist(), ['Morning', 'Evening'])
+
 class TestStorage(unittest.TestCase):
     """
     Tests for the data storage module.
@@ -149,7 +306,7 @@ class TestStorage(unittest.TestCase):
     
     def test_database_connection(self):
         """Test that we can connect to the database."""
-        from src.storage import WeatherDatabase
+        from storage import WeatherDatabase
         
         db = WeatherDatabase()
         result = db.connect()
@@ -178,7 +335,7 @@ class TestEndToEndPipeline(unittest.TestCase):
         
         # 3. LOAD (skip if database not available)
         try:
-            from src.storage import WeatherDatabase
+            from storage import WeatherDatabase
             db = WeatherDatabase()
             if db.connect():
                 rows = db.insert_weather_data(df)
@@ -186,37 +343,3 @@ class TestEndToEndPipeline(unittest.TestCase):
                 self.assertGreater(rows, 0, "Should insert at least 1 row")
         except:
             self.skipTest("Database not available for integration test")
-
-def run_tests():
-    """
-    Run all tests and display results.
-    """
-    # Create test suite
-    loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
-    
-    # Add all test classes
-    suite.addTests(loader.loadTestsFromTestCase(TestIngestion))
-    suite.addTests(loader.loadTestsFromTestCase(TestTransformation))
-    suite.addTests(loader.loadTestsFromTestCase(TestStorage))
-    suite.addTests(loader.loadTestsFromTestCase(TestEndToEndPipeline))
-    
-    # Run tests with verbose output
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-    
-    # Print summary
-    print("\n" + "=" * 60)
-    print("TEST SUMMARY")
-    print("=" * 60)
-    print(f"Tests run: {result.testsRun}")
-    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
-    print(f"Failures: {len(result.failures)}")
-    print(f"Errors: {len(result.errors)}")
-    print(f"Skipped: {len(result.skipped)}")
-    
-    return result.wasSuccessful()
-
-if __name__ == "__main__":
-    success = run_tests()
-    sys.exit(0 if success else 1)
\ No newline at end of file